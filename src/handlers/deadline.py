@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+
+
+# базовое значение - прежний фиксированный таймаут, длинные тексты получают больше
+ANALYSIS_TIMEOUT_BASE = float(os.getenv("ANALYSIS_TIMEOUT_BASE", "100.0"))
+ANALYSIS_TIMEOUT_PER_KCHAR = float(os.getenv("ANALYSIS_TIMEOUT_PER_KCHAR", "5.0"))
+ANALYSIS_TIMEOUT_MAX = float(os.getenv("ANALYSIS_TIMEOUT_MAX", "300.0"))
+
+
+class AnalysisCancelled(Exception):
+    """
+    анализ остановлен на контрольной точке: истек дедлайн или задача отменена.
+    partial_result содержит результаты уже завершенных анализаторов
+    """
+
+    def __init__(self, stage, partial_result=None):
+        super().__init__(f"analysis cancelled at stage: {stage}")
+        self.stage = stage
+        self.partial_result = partial_result
+
+
+class AnalysisDeadline:
+    """
+    дедлайн анализа, общий для event loop и потока executor'а.
+    поток проверяет его между этапами, handler может отменить его явно
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self._cancelled = threading.Event()
+
+    @classmethod
+    def for_text(cls, text):
+        """таймаут растет с длиной транскрипта"""
+        timeout = ANALYSIS_TIMEOUT_BASE + ANALYSIS_TIMEOUT_PER_KCHAR * len(text) / 1000
+        return cls(min(timeout, ANALYSIS_TIMEOUT_MAX))
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self._cancelled.is_set() or time.monotonic() >= self.expires_at
+
+    def check(self, stage):
+        if self.expired():
+            raise AnalysisCancelled(stage)
+
+
+def checkpoint(deadline, stage):
+    """контрольная точка: прерывает анализ после дедлайна или отмены"""
+    if deadline is not None:
+        deadline.check(stage)
@@ -1,10 +1,13 @@
 import asyncio
 import json
+import os
 
 from loguru import logger
 from aio_pika import IncomingMessage
 
+from handlers.deadline import AnalysisCancelled, AnalysisDeadline
 from handlers.text_processor import TextProcessor
+from handlers.service_time import service_time
 from .dict import (
     stop_words,
     target_words_1,
@@ -17,6 +20,11 @@ from .dict import (
 )
 
 
+# запас сверх дедлайна на этап, который нельзя прервать (segment, tag_morph)
+ANALYSIS_TIMEOUT_GRACE = float(os.getenv("ANALYSIS_TIMEOUT_GRACE", "30.0"))
+# публиковать результаты завершенных анализаторов, если дедлайн истек
+PARTIAL_RESULTS = os.getenv("PARTIAL_RESULTS", "false").lower() in ("1", "true", "yes")
+
 processor = TextProcessor(
     target_words_1=target_words_1,
     target_words_2=target_words_2,
@@ -44,14 +52,40 @@ async def handle_message(message: IncomingMessage):
             await message.reject()
             return
 
+        deadline = AnalysisDeadline.for_text(text)
         loop = asyncio.get_event_loop()
         try:
             result_data = await asyncio.wait_for(
-                loop.run_in_executor(None, processor.analyze_text, master_id, text),
-                timeout=100.0,
+                loop.run_in_executor(
+                    None,
+                    service_time.measure,
+                    processor.analyze_text,
+                    master_id,
+                    text,
+                    deadline,
+                ),
+                timeout=deadline.timeout + ANALYSIS_TIMEOUT_GRACE,
+            )
+        except AnalysisCancelled as e:
+            if not PARTIAL_RESULTS or e.partial_result is None:
+                logger.error(
+                    f"text processing timeout for master_id={master_id} "
+                    f"at stage {e.stage} ({deadline.timeout:.0f}s)"
+                )
+                await message.reject()
+                return
+            logger.warning(
+                f"deadline reached for master_id={master_id} at stage {e.stage}, "
+                "publishing partial result"
             )
+            result_data = {**e.partial_result, "Partial": True, "CancelledAt": e.stage}
         except asyncio.TimeoutError:
-            logger.error(f"text processing timeout for master_id={master_id}")
+            # дедлайн к этому моменту уже истек: если поток еще работает, он
+            # остановится сам на первой контрольной точке после этапа без проверок
+            logger.error(
+                f"text processing timeout for master_id={master_id}, "
+                "no checkpoint reached within grace period"
+            )
             await message.reject()
             return
 
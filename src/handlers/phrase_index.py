@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from importlib import metadata
+from types import MappingProxyType
+
+import pymorphy3
+
+from loguru import logger
+
+
+PHRASE_CACHE_PATH = os.getenv("PHRASE_CACHE_PATH", "cache/phrase_lemmas.json")
+
+
+def lemmatize_phrase(morph, phrase):
+    """лемматизация фразы"""
+    tokens = phrase.split()
+    lemmatized_tokens = [morph.parse(token)[0].normal_form for token in tokens]
+    return " ".join(lemmatized_tokens)
+
+
+def compile_phrase(lemmatized_phrase):
+    return re.compile(r"\b" + re.escape(lemmatized_phrase) + r"\b")
+
+
+class PhraseIndex:
+    """
+    неизменяемая структура, общая для всех анализаторов фраз:
+    фраза -> лемматизированная фраза -> скомпилированный шаблон.
+    одинаковые фразы и одинаковые леммы хранятся один раз
+    """
+
+    def __init__(self, lemmas):
+        self.lemmas = MappingProxyType(dict(lemmas))
+        self.patterns = MappingProxyType(
+            {lemma: compile_phrase(lemma) for lemma in set(self.lemmas.values())}
+        )
+
+    def __contains__(self, phrase):
+        return phrase in self.lemmas
+
+    def __len__(self):
+        return len(self.lemmas)
+
+    def lemma(self, phrase):
+        return self.lemmas.get(phrase)
+
+    def pattern(self, phrase):
+        return self.patterns[self.lemmas[phrase]]
+
+
+def collect_phrases(dictionaries):
+    """уникальные фразы из словарей вида {категория: [фразы]}"""
+    phrases = set()
+    for target_words in dictionaries:
+        for category_phrases in target_words.values():
+            phrases.update(category_phrases)
+    return sorted(phrases)
+
+
+def _package_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+def cache_key(phrases):
+    """ключ кэша: хэш словарей и версии pymorphy3 и его словаря"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(phrases, ensure_ascii=False).encode())
+    digest.update(pymorphy3.__version__.encode())
+    digest.update(_package_version("pymorphy3-dicts-ru").encode())
+    return digest.hexdigest()
+
+
+def _read_cache(path, key):
+    try:
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"phrase cache {path} is unreadable: {e}")
+        return None
+    if not isinstance(cached, dict):
+        logger.warning(f"phrase cache {path} has unexpected format, rebuilding")
+        return None
+    lemmas = cached.get("lemmas")
+    if (
+        cached.get("key") != key
+        or not isinstance(lemmas, dict)
+        or not all(isinstance(lemma, str) for lemma in lemmas.values())
+    ):
+        logger.info(f"phrase cache {path} is stale, rebuilding")
+        return None
+    return lemmas
+
+
+def _write_cache(path, key, lemmas):
+    directory = os.path.dirname(path) or "."
+    tmp_path = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False
+        ) as f:
+            tmp_path = f.name
+            json.dump({"key": key, "lemmas": lemmas}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"failed to write phrase cache {path}: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_phrase_index(dictionaries, morph, cache_path=PHRASE_CACHE_PATH):
+    """
+    строит PhraseIndex для всех словарей сразу. при совпадении ключа
+    лемматизация берется из файла кэша, иначе считается и сохраняется
+    """
+    phrases = collect_phrases(dictionaries)
+    key = cache_key(phrases)
+
+    lemmas = _read_cache(cache_path, key) if cache_path else None
+    if lemmas is not None and all(phrase in lemmas for phrase in phrases):
+        logger.info(f"loaded {len(lemmas)} phrase lemmas from {cache_path}")
+        return PhraseIndex(lemmas)
+
+    lemmas = {phrase: lemmatize_phrase(morph, phrase) for phrase in phrases}
+    logger.info(f"lemmatized {len(lemmas)} unique phrases")
+    if cache_path:
+        _write_cache(cache_path, key, lemmas)
+    return PhraseIndex(lemmas)
@@ -0,0 +1,45 @@
+import threading
+import time
+
+from collections import deque
+
+
+class ServiceTimeTracker:
+    """
+    процессорное время анализа одного сообщения по последним window
+    сообщениям. в отличие от времени ожидания ответа не растет, когда
+    несколько сообщений делят GIL. учитываются только завершенные анализы:
+    прерванные по дедлайну и упавшие считаются отдельно в failed
+    """
+
+    def __init__(self, window=50):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.completed += 1
+
+    def mean(self):
+        with self._lock:
+            if not self._samples:
+                return None
+            return sum(self._samples) / len(self._samples)
+
+    def measure(self, func, *args):
+        """вызов func в текущем потоке с учетом его процессорного времени"""
+        started = time.thread_time()
+        try:
+            result = func(*args)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        self.record(time.thread_time() - started)
+        return result
+
+
+service_time = ServiceTimeTracker()
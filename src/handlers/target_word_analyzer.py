@@ -7,12 +7,15 @@ from collections import defaultdict
 from loguru import logger
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+from .deadline import checkpoint
+from .phrase_index import compile_phrase, lemmatize_phrase
+
 
 class TargetWordAnalyzer(ABC):
     """абстрактный класс для анализа target_words"""
 
     @abstractmethod
-    def analyze(self, tokens, target_words, result_key):
+    def analyze(self, tokens, target_words, result_key, deadline=None):
         pass
 
 
@@ -22,11 +25,12 @@ class MostFrequentTargetWordAnalyzer(TargetWordAnalyzer):
     def __init__(self, compare_function):
         self.compare_function = compare_function
 
-    def analyze(self, tokens, target_words, result_key):
+    def analyze(self, tokens, target_words, result_key, deadline=None):
         category_counter = Counter()
         word_counter = defaultdict(lambda: Counter())
 
         for token in tokens:
+            checkpoint(deadline, result_key)
             for category, phrases in target_words.items():
                 for phrase in phrases:
                     if self.compare_function(token, phrase):
@@ -62,11 +66,12 @@ class LastMentionedTargetWordAnalyzer(TargetWordAnalyzer):
     def __init__(self, compare_function):
         self.compare_function = compare_function
 
-    def analyze(self, tokens, target_words, result_key):
+    def analyze(self, tokens, target_words, result_key, deadline=None):
         last_mentioned = None
         last_match = None
 
         for token in tokens:
+            checkpoint(deadline, result_key)
             for key, phrases in target_words.items():
                 for phrase in phrases:
                     for part in phrase.split():
@@ -97,7 +102,7 @@ class AdvertSourceTargetWordAnalyzer(TargetWordAnalyzer):
         self.compare_function = compare_function
         self.answer_matcher = AnswerMatcher(target_words_answer_tags)
 
-    def analyze(self, text, target_words, result_key):
+    def analyze(self, text, target_words, result_key, deadline=None):
         answer = None
 
         for phrase in target_words:
@@ -200,7 +205,7 @@ class LastTargetPhraseAnalyzer(TargetWordAnalyzer):
 
         return False
 
-    def analyze(self, tokens, target_words, result_key):
+    def analyze(self, tokens, target_words, result_key, deadline=None):
         """анализируем текст, выбирая последнее совпадение"""
         selected_category = self.find_last_match_in_text(tokens, target_words)
 
@@ -216,7 +221,7 @@ class MostValuableWordAnalyzer(TargetWordAnalyzer):
     def __init__(self, compare_function):
         self.compare_function = compare_function
 
-    def analyze(self, tokens, target_words, result_key):
+    def analyze(self, tokens, target_words, result_key, deadline=None):
         target_phrases = []
         for category, phrases in target_words.items():
             for phrase in phrases:
@@ -257,6 +262,7 @@ class MostValuableWordAnalyzer(TargetWordAnalyzer):
         }
 
         for token in tokens:
+            checkpoint(deadline, result_key)
             for category, phrases in target_words.items():
                 for phrase in phrases:
                     if self.compare_function(token, phrase):
@@ -304,15 +310,17 @@ class MostValuableWordAnalyzer(TargetWordAnalyzer):
 
 
 class MostFrequentTargetPhraseAnalyzer(TargetWordAnalyzer):
-    def __init__(self, compare_function):
+    def __init__(self, compare_function, phrase_index=None, morph=None):
         self.compare_function = compare_function
-        self.morph = pymorphy3.MorphAnalyzer()
+        self.phrase_index = phrase_index
+        self.morph = morph or pymorphy3.MorphAnalyzer()
 
-    def lemmatize_phrase(self, phrase):
-        """лемматизация фразы"""
-        tokens = phrase.split()
-        lemmatized_tokens = [self.morph.parse(token)[0].normal_form for token in tokens]
-        return " ".join(lemmatized_tokens)
+    def compiled_phrase(self, phrase):
+        """лемматизированная фраза и шаблон для поиска в тексте"""
+        if self.phrase_index is not None and phrase in self.phrase_index:
+            return self.phrase_index.lemma(phrase), self.phrase_index.pattern(phrase)
+        lemmatized_phrase = lemmatize_phrase(self.morph, phrase)
+        return lemmatized_phrase, compile_phrase(lemmatized_phrase)
 
     def count_matches_in_text(self, tokens, target_phrases):
         """подсчет количества совпадений для каждой категории"""
@@ -325,9 +333,8 @@ class MostFrequentTargetPhraseAnalyzer(TargetWordAnalyzer):
             category_counts[category] = 0
 
             for phrase in phrases:
-                lemmatized_phrase = self.lemmatize_phrase(phrase)
-                pattern = r"\b" + re.escape(lemmatized_phrase) + r"\b"
-                matches = re.findall(pattern, text)
+                lemmatized_phrase, pattern = self.compiled_phrase(phrase)
+                matches = pattern.findall(text)
 
                 if matches:
                     category_counts[category] += len(matches)
@@ -337,7 +344,7 @@ class MostFrequentTargetPhraseAnalyzer(TargetWordAnalyzer):
 
         return category_counts
 
-    def analyze(self, tokens, target_words, result_key):
+    def analyze(self, tokens, target_words, result_key, deadline=None):
         """анализируем текст, выбирая категорию с наибольшим количеством совпадений"""
         category_counts = self.count_matches_in_text(tokens, target_words)
 
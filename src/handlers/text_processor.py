@@ -5,6 +5,7 @@ from loguru import logger
 from natasha import Doc, Segmenter, MorphVocab, NewsEmbedding, NewsMorphTagger
 
 from rabbitmq.publisher import publish_results_verbametrics_dg_queue
+from .deadline import AnalysisCancelled, checkpoint
 from .dict import (
     stop_words,
     target_words_1,
@@ -15,6 +16,7 @@ from .dict import (
     target_words_6,
     target_words_answer_tags,
 )
+from .phrase_index import load_phrase_index
 from .target_word_analyzer import (
     LastMentionedTargetWordAnalyzer,
     AdvertSourceTargetWordAnalyzer,
@@ -24,6 +26,8 @@ from .target_word_analyzer import (
 
 
 class TextProcessor:
+    LEMMATIZE_CHECK_EVERY = 500
+
     def __init__(
         self,
         target_words_1=None,
@@ -50,15 +54,27 @@ class TextProcessor:
         self.stop_words = stop_words or set()
         self.target_words_answer_tags = target_words_answer_tags
 
+        # леммы фраз считаются один раз на все анализаторы фраз
+        self.phrase_index = load_phrase_index(
+            [self.target_words_2, self.target_words_5, self.target_words_6],
+            self.morph,
+        )
+
         self.analyzers = {
             "target_words_1": MostValuableWordAnalyzer(self.compare_words),
-            "target_words_2": MostFrequentTargetPhraseAnalyzer(self.compare_words),
+            "target_words_2": MostFrequentTargetPhraseAnalyzer(
+                self.compare_words, self.phrase_index, self.morph
+            ),
             "target_words_3": LastMentionedTargetWordAnalyzer(self.compare_words),
             "target_words_4": AdvertSourceTargetWordAnalyzer(
                 self.compare_words, self.target_words_answer_tags
             ),
-            "target_words_5": MostFrequentTargetPhraseAnalyzer(self.compare_words),
-            "target_words_6": MostFrequentTargetPhraseAnalyzer(self.compare_words),
+            "target_words_5": MostFrequentTargetPhraseAnalyzer(
+                self.compare_words, self.phrase_index, self.morph
+            ),
+            "target_words_6": MostFrequentTargetPhraseAnalyzer(
+                self.compare_words, self.phrase_index, self.morph
+            ),
         }
 
     def compare_words(self, word1, word2):
@@ -66,7 +82,7 @@ class TextProcessor:
         lemma2 = self.morph.parse(word2)[0].normal_form
         return lemma1 == lemma2
 
-    def process_text(self, text):
+    def process_text(self, text, deadline=None):
         """лемматизация текста"""
         logger.info("processing text...")
         text = text.lower()
@@ -74,14 +90,18 @@ class TextProcessor:
 
         doc = Doc(text)
         logger.info("segmenting...")
+        checkpoint(deadline, "segment")
         doc.segment(self.segmenter)
 
         logger.info("tagging morphology...")
+        checkpoint(deadline, "tag_morph")
         doc.tag_morph(self.morph_tagger)
 
         root_tokens = []
 
         for i, token in enumerate(doc.tokens):
+            if i % self.LEMMATIZE_CHECK_EVERY == 0:
+                checkpoint(deadline, "lemmatize")
             try:
                 token.lemmatize(self.morph_vocab)
                 if token.lemma in self.stop_words:
@@ -94,55 +114,82 @@ class TextProcessor:
         logger.info(f"total root tokens: {len(root_tokens)}")
         return root_tokens
 
-    def analyze_text(self, master_id, text):
-        """функция анализа текста"""
+    def build_result(self, master_id, result_data):
+        return {
+            "ChannelName": "IncomingCall",
+            "Event": "verbaMetrics",
+            "MasterID": master_id,
+            **result_data,
+        }
+
+    def analyze_text(self, master_id, text, deadline=None):
+        """
+        функция анализа текста. при переданном deadline время проверяется
+        между этапами и внутри анализаторов; если истекло - AnalysisCancelled,
+        в partial_result которого результаты уже завершенных анализаторов,
+        а не успевшие отработать получают None
+        """
         logger.info(f"analyzing text for master_id: {master_id}")
-        root_tokens = self.process_text(text)
+        root_tokens = self.process_text(text, deadline)
 
         result_data = {}
+        try:
+            self.run_analyzers(root_tokens, text, result_data, deadline)
+        except AnalysisCancelled as e:
+            missing = {key: None for key in self.analyzers if key not in result_data}
+            e.partial_result = self.build_result(master_id, {**result_data, **missing})
+            raise
+
+        logger.info(f"result data: {result_data}")
+        return self.build_result(master_id, result_data)
 
+    def run_analyzers(self, root_tokens, text, result_data, deadline=None):
+        """заполняет result_data по мере завершения анализаторов"""
+        checkpoint(deadline, "target_words_5")
         try:
             logger.info("analyzing target_words_5...")
             target_words_5_result = self.analyzers["target_words_5"].analyze(
-                root_tokens, self.target_words_5, "target_words_5"
+                root_tokens, self.target_words_5, "target_words_5", deadline
             )
             result_data["target_words_5"] = target_words_5_result
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             logger.error(f"error analyzing target_words_5: {e}")
             result_data["target_words_5"] = None
             target_words_5_result = None
 
+        checkpoint(deadline, "target_words_6")
         try:
             if target_words_5_result is None:
                 logger.info("target_words_5 not found, analyzing target_words_6...")
                 target_words_6_result = self.analyzers["target_words_6"].analyze(
-                    root_tokens, self.target_words_6, "target_words_6"
+                    root_tokens, self.target_words_6, "target_words_6", deadline
                 )
                 result_data["target_words_6"] = target_words_6_result
             else:
                 result_data["target_words_6"] = None
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             logger.error(f"error analyzing target_words_6: {e}")
             result_data["target_words_6"] = None
 
         for key, analyzer in self.analyzers.items():
             if key not in ["target_words_5", "target_words_6"]:
+                checkpoint(deadline, key)
                 try:
                     logger.info(f"analyzing {key}...")
                     source = root_tokens if key != "target_words_4" else text
-                    result_data[key] = analyzer.analyze(source, getattr(self, key), key)
+                    result_data[key] = analyzer.analyze(
+                        source, getattr(self, key), key, deadline
+                    )
+                except AnalysisCancelled:
+                    raise
                 except Exception as e:
                     logger.error(f"error analyzing {key}: {e}")
                     result_data[key] = None
 
-        logger.info(f"result data: {result_data}")
-        return {
-            "ChannelName": "IncomingCall",
-            "Event": "verbaMetrics",
-            "MasterID": master_id,
-            **result_data,
-        }
-
     @staticmethod
     async def publish_results_to_queue(data):
         """публикация результатов в очередь"""
@@ -0,0 +1,256 @@
+import asyncio
+import itertools
+
+from aio_pika import exceptions
+
+
+class FakeDeclarationResult:
+    """аналог ответа queue.declare_ok: количество сообщений и консьюмеров"""
+
+    def __init__(self, message_count, consumer_count):
+        self.message_count = message_count
+        self.consumer_count = consumer_count
+
+
+class FakeIncomingMessage:
+    """входящее сообщение с ack/reject/nack, как у aio_pika.IncomingMessage"""
+
+    def __init__(self, queue, body, delivery_tag, redelivered=False):
+        self.body = body
+        self.delivery_tag = delivery_tag
+        self.redelivered = redelivered
+        self.routing_key = queue.name
+        self._queue = queue
+        self._channel = None
+        self.processed = False
+
+    async def ack(self, multiple=False):
+        self._settle()
+        self._queue.broker.acked += 1
+
+    async def reject(self, requeue=False):
+        self._settle()
+        self._queue.broker.rejected += 1
+        if requeue:
+            self._queue.requeue(self)
+
+    async def nack(self, multiple=False, requeue=True):
+        await self.reject(requeue=requeue)
+
+    def _settle(self):
+        if self.processed:
+            raise exceptions.MessageProcessError("message already processed", self)
+        self.processed = True
+        if self._channel is not None:
+            self._channel.release(self)
+
+
+class FakeQueueStorage:
+    """хранилище сообщений одной очереди на стороне брокера"""
+
+    def __init__(self, broker, name):
+        self.broker = broker
+        self.name = name
+        self.messages = asyncio.Queue()
+        self.consumers = {}
+
+    def put(self, body, redelivered=False):
+        message = FakeIncomingMessage(
+            self, body, next(self.broker.delivery_tags), redelivered
+        )
+        self.messages.put_nowait(message)
+        self.broker.on_enqueue(self.name, body)
+
+    def requeue(self, message):
+        self.broker.redelivered += 1
+        self.put(message.body, redelivered=True)
+
+
+class FakeQueue:
+    """результат channel.declare_queue: очередь, привязанная к каналу"""
+
+    def __init__(self, storage, channel):
+        self.name = storage.name
+        self._storage = storage
+        self._channel = channel
+        self.declaration_result = FakeDeclarationResult(
+            storage.messages.qsize(), len(storage.consumers)
+        )
+
+    async def consume(self, callback, no_ack=False, consumer_tag=None, **kwargs):
+        tag = consumer_tag or f"ctag.{next(self._storage.broker.consumer_tags)}"
+        task = asyncio.create_task(
+            self._channel.deliver(self._storage, callback, no_ack)
+        )
+        self._storage.consumers[tag] = task
+        self._channel.consumers[tag] = self._storage
+        return tag
+
+    async def cancel(self, consumer_tag, **kwargs):
+        await self._channel.cancel(consumer_tag)
+
+
+class FakeExchange:
+    """default exchange: маршрутизирует по имени очереди"""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    async def publish(self, message, routing_key, **kwargs):
+        if self.broker.publish_latency:
+            await asyncio.sleep(self.broker.publish_latency)
+        self.broker.get_queue(routing_key).put(message.body)
+
+
+class FakeChannel:
+    """канал с prefetch_count и учетом неподтвержденных сообщений"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.broker = connection.broker
+        self.default_exchange = FakeExchange(self.broker)
+        self.prefetch_count = 0
+        self.is_closed = False
+        self.consumers = {}
+        self._callbacks = set()
+        self._unacked = set()
+        self._window = asyncio.Condition()
+
+    async def set_qos(self, prefetch_count=0, **kwargs):
+        self.prefetch_count = prefetch_count
+        await self._notify()
+
+    async def declare_queue(self, name, durable=False, passive=False, **kwargs):
+        if self.is_closed:
+            raise exceptions.ChannelInvalidStateError("channel closed")
+        if passive and name not in self.broker.queues:
+            # rabbitmq закрывает канал при 404 на пассивном declare
+            await self.close()
+            raise exceptions.ChannelNotFoundEntity(f"NOT_FOUND - no queue '{name}'")
+        return FakeQueue(self.broker.get_queue(name), self)
+
+    def release(self, message):
+        self._unacked.discard(message)
+        if not self.is_closed:
+            asyncio.get_running_loop().create_task(self._notify())
+
+    async def _notify(self):
+        async with self._window:
+            self._window.notify_all()
+
+    def _window_open(self):
+        return not self.prefetch_count or len(self._unacked) < self.prefetch_count
+
+    async def deliver(self, storage, callback, no_ack):
+        """цикл доставки: ждем свободное место в окне prefetch и сообщение"""
+        while True:
+            async with self._window:
+                await self._window.wait_for(self._window_open)
+            message = await storage.messages.get()
+            message._channel = self
+            if no_ack:
+                message.processed = True
+            else:
+                self._unacked.add(message)
+            task = asyncio.create_task(callback(message))
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    async def cancel(self, consumer_tag):
+        storage = self.consumers.pop(consumer_tag, None)
+        if storage is None:
+            return
+        task = storage.consumers.pop(consumer_tag)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def drain(self):
+        """ожидание уже запущенных обработчиков сообщений"""
+        current = asyncio.current_task()
+        pending = [task for task in self._callbacks if task is not current]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def close(self):
+        """
+        новые доставки прекращаются, запущенные обработчики дорабатывают;
+        оставшиеся неподтвержденными сообщения возвращаются как redelivered
+        """
+        for consumer_tag in list(self.consumers):
+            await self.cancel(consumer_tag)
+        await self.drain()
+        self.is_closed = True
+        for message in list(self._unacked):
+            message.processed = True
+            message._queue.requeue(message)
+        self._unacked.clear()
+
+
+class FakeConnection:
+    """соединение, совместимое с connect_robust и async with"""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_closed = False
+        self._channels = []
+
+    async def channel(self):
+        channel = FakeChannel(self)
+        self._channels.append(channel)
+        return channel
+
+    async def close(self):
+        if self.is_closed:
+            return
+        self.is_closed = True
+        for channel in self._channels:
+            await channel.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class FakeBroker:
+    """
+    in-process замена rabbitmq для нагрузочного теста. реализует только то,
+    что используется в rabbitmq/connection.py и rabbitmq/publisher.py
+    """
+
+    def __init__(self, queues=(), connect_latency=0.0, publish_latency=0.0):
+        self.queues = {}
+        self.connect_latency = connect_latency
+        self.publish_latency = publish_latency
+        self.delivery_tags = itertools.count(1)
+        self.consumer_tags = itertools.count(1)
+        self.connections = 0
+        self.acked = 0
+        self.rejected = 0
+        self.redelivered = 0
+        self._listeners = []
+        for name in queues:
+            self.get_queue(name)
+
+    def get_queue(self, name):
+        if name not in self.queues:
+            self.queues[name] = FakeQueueStorage(self, name)
+        return self.queues[name]
+
+    def depth(self, name):
+        return self.get_queue(name).messages.qsize()
+
+    def subscribe(self, listener):
+        """listener(queue_name, body) вызывается на каждое попадание в очередь"""
+        self._listeners.append(listener)
+
+    def on_enqueue(self, queue_name, body):
+        for listener in self._listeners:
+            listener(queue_name, body)
+
+    async def connect_robust(self, url=None, **kwargs):
+        if self.connect_latency:
+            await asyncio.sleep(self.connect_latency)
+        self.connections += 1
+        return FakeConnection(self)
@@ -0,0 +1,300 @@
+"""
+нагрузочный тест конвейера connect_to_rabbitmq -> handle_message ->
+publish_results_verbametrics_dg_queue на in-process брокере (fake_amqp).
+
+запуск из каталога src:
+    python -m loadtest.load_generator --rate 2 --duration 60 --message-size 3000
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from loguru import logger
+
+from loadtest.fake_amqp import FakeBroker
+from rabbitmq import connection, publisher
+
+
+FILLER_WORDS = (
+    "здравствуйте",
+    "да",
+    "нет",
+    "хорошо",
+    "подскажите",
+    "пожалуйста",
+    "спасибо",
+    "клиника",
+    "запись",
+    "врач",
+    "приём",
+    "завтра",
+    "утром",
+    "вечером",
+    "стоимость",
+    "сколько",
+    "можно",
+    "мне",
+    "нужно",
+    "глаз",
+)
+
+
+def collect_phrases():
+    """фразы из словарей target_words, чтобы анализаторы находили совпадения"""
+    from handlers import dict as dictionaries
+
+    phrases = []
+    for name in dir(dictionaries):
+        if not name.startswith("target_words"):
+            continue
+        value = getattr(dictionaries, name)
+        items = value.values() if isinstance(value, dict) else [value]
+        for item in items:
+            if isinstance(item, str):
+                phrases.append(item)
+            else:
+                phrases.extend(p for p in item if isinstance(p, str))
+    return phrases
+
+
+def generate_text(size, phrases, match_ratio, rng):
+    """диалог оператор/абонент длиной примерно size символов"""
+    lines = []
+    length = 0
+    speakers = ("оператор", "абонент")
+    while length < size:
+        words = []
+        for _ in range(rng.randint(4, 12)):
+            if phrases and rng.random() < match_ratio:
+                words.append(rng.choice(phrases))
+            else:
+                words.append(rng.choice(FILLER_WORDS))
+        line = f"{speakers[len(lines) % 2]}: {' '.join(words)}"
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def memory_mb():
+    """
+    (метка, МБ): текущий rss из /proc, на системах без /proc - пиковый rss
+    из getrusage (ru_maxrss на macOS в байтах, на остальных unix в КБ)
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return "rss_mb", pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return "rss_mb", None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    unit = 1 if sys.platform == "darwin" else 1024
+    return "peak_rss_mb", max_rss * unit / 2**20
+
+
+class LoadStats:
+    """сбор метрик: отправлено, опубликовано, задержки, память во времени"""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.started_at = time.perf_counter()
+        self.sent = 0
+        self.sent_at = {}
+        self.latencies = []
+        self.published = 0
+        self.samples = []
+        self._last_published = 0
+        self._last_sample_at = self.started_at
+
+    def on_enqueue(self, queue_name, body):
+        if queue_name != publisher.VERBAMETRICS_DG_QUEUE:
+            return
+        master_id = json.loads(body).get("MasterID")
+        sent_at = self.sent_at.pop(master_id, None)
+        self.published += 1
+        if sent_at is not None:
+            self.latencies.append(time.perf_counter() - sent_at)
+
+    def settled(self):
+        return self.broker.acked + self.broker.rejected >= self.sent
+
+    def sample(self):
+        now = time.perf_counter()
+        interval = now - self._last_sample_at
+        row = {
+            "elapsed": now - self.started_at,
+            "sent": self.sent,
+            "published": self.published,
+            "rate": (self.published - self._last_published) / interval
+            if interval
+            else 0.0,
+            "depth": self.broker.depth(connection.QUEUE_NAME),
+            "acked": self.broker.acked,
+            "rejected": self.broker.rejected,
+            "redelivered": self.broker.redelivered,
+        }
+        label, value = memory_mb()
+        row[label] = value
+        self._last_published = self.published
+        self._last_sample_at = now
+        self.samples.append(row)
+        return row
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "elapsed": elapsed,
+            "sent": self.sent,
+            "published": self.published,
+            "throughput": self.published / elapsed if elapsed else 0.0,
+            "acked": self.broker.acked,
+            "rejected": self.broker.rejected,
+            "redelivered": self.broker.redelivered,
+            "unpublished": len(self.sent_at),
+            "connections": self.broker.connections,
+            "latency_p50": percentile(self.latencies, 50),
+            "latency_p90": percentile(self.latencies, 90),
+            "latency_p99": percentile(self.latencies, 99),
+            "latency_max": max(self.latencies, default=None),
+            "memory_mb_max": max(
+                (
+                    s.get("rss_mb", s.get("peak_rss_mb"))
+                    for s in self.samples
+                    if s.get("rss_mb", s.get("peak_rss_mb")) is not None
+                ),
+                default=None,
+            ),
+        }
+
+
+def format_value(value):
+    if value is None:
+        return "n/a"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+async def produce(broker, stats, args, phrases):
+    """отправка сообщений во входную очередь с заданной частотой"""
+    rng = random.Random(args.seed)
+    queue = broker.get_queue(connection.QUEUE_NAME)
+    interval = 1 / args.rate
+    deadline = time.perf_counter() + args.duration
+    next_at = time.perf_counter()
+    number = 0
+    while next_at < deadline:
+        spread = int(args.message_size * args.size_spread)
+        size = args.message_size + rng.randint(-spread, spread)
+        master_id = f"load-{number}"
+        body = json.dumps(
+            {
+                "MasterID": master_id,
+                "text": generate_text(size, phrases, args.match_ratio, rng),
+            }
+        ).encode()
+        stats.sent_at[master_id] = time.perf_counter()
+        stats.sent += 1
+        queue.put(body)
+        number += 1
+        next_at += rng.expovariate(args.rate) if args.poisson else interval
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+
+async def report(stats, interval):
+    while True:
+        await asyncio.sleep(interval)
+        row = stats.sample()
+        print(" | ".join(f"{key}={format_value(value)}" for key, value in row.items()))
+
+
+async def run(args):
+    broker = FakeBroker(
+        queues=(connection.QUEUE_NAME, publisher.VERBAMETRICS_DG_QUEUE),
+        connect_latency=args.connect_latency,
+        publish_latency=args.publish_latency,
+    )
+    stats = LoadStats(broker)
+    broker.subscribe(stats.on_enqueue)
+
+    connection.connect_robust = broker.connect_robust
+    publisher.connect_robust = broker.connect_robust
+    connection.shutdown_event.clear()
+
+    phrases = collect_phrases()
+    consumer = asyncio.create_task(connection.connect_to_rabbitmq())
+    reporter = asyncio.create_task(report(stats, args.report_interval))
+
+    await produce(broker, stats, args, phrases)
+
+    drain_deadline = time.perf_counter() + args.drain_timeout
+    while not stats.settled() and time.perf_counter() < drain_deadline:
+        await asyncio.sleep(0.1)
+
+    reporter.cancel()
+    stats.sample()
+    connection.shutdown_event.set()
+    await asyncio.gather(consumer, reporter, return_exceptions=True)
+
+    print("summary:")
+    for key, value in stats.summary().items():
+        print(f"  {key}: {format_value(value)}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="verbaMetrics load test")
+    parser.add_argument("--rate", type=float, default=1.0, help="messages/sec")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument(
+        "--message-size", type=int, default=2000, help="text length, chars"
+    )
+    parser.add_argument(
+        "--size-spread", type=float, default=0.0, help="± share of message size"
+    )
+    parser.add_argument(
+        "--match-ratio",
+        type=float,
+        default=0.1,
+        help="share of words taken from target_words",
+    )
+    parser.add_argument(
+        "--poisson", action="store_true", help="exponential inter-arrival times"
+    )
+    parser.add_argument("--connect-latency", type=float, default=0.0)
+    parser.add_argument("--publish-latency", type=float, default=0.0)
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    parser.add_argument("--drain-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
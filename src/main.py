@@ -1,30 +1,40 @@
 import asyncio
 
 from fastapi import FastAPI
-from rabbitmq.connection import connect_to_rabbitmq
+from rabbitmq.connection import autoscaler, connect_to_rabbitmq
 from logger.logger import setup_logger
 
 setup_logger()
 app = FastAPI()
+app.state.autoscaler = autoscaler
 
 rabbitmq_task = None  # глобальная переменная для хранения задачи
+autoscaler_task = None
 
 
 @app.on_event("startup")
 async def startup_event():
-    global rabbitmq_task
+    global rabbitmq_task, autoscaler_task
     rabbitmq_task = asyncio.create_task(connect_to_rabbitmq())
+    autoscaler_task = asyncio.create_task(autoscaler.run())
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    global rabbitmq_task
-    if rabbitmq_task:
-        rabbitmq_task.cancel()
-        try:
-            await rabbitmq_task
-        except asyncio.CancelledError:
-            pass
+    global rabbitmq_task, autoscaler_task
+    for task in (autoscaler_task, rabbitmq_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+@app.get("/autoscaling")
+async def autoscaling():
+    """рекомендуемое число обработчиков и оценка времени разбора очереди"""
+    return autoscaler.snapshot()
 
 
 # если запускается напрямую
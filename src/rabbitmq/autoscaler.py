@@ -0,0 +1,171 @@
+import asyncio
+import math
+import os
+import time
+
+from loguru import logger
+
+
+AUTOSCALER_POLL_INTERVAL = float(os.getenv("AUTOSCALER_POLL_INTERVAL", "10.0"))
+AUTOSCALER_RESIZE = os.getenv("AUTOSCALER_RESIZE", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+WORKERS_MIN = int(os.getenv("WORKERS_MIN", "1"))
+WORKERS_MAX = int(os.getenv("WORKERS_MAX", "4"))
+TARGET_DRAIN_SECONDS = float(os.getenv("TARGET_DRAIN_SECONDS", "300.0"))
+TARGET_UTILIZATION = float(os.getenv("TARGET_UTILIZATION", "0.8"))
+
+
+class WorkerAutoscaler:
+    """
+    сигнал для масштабирования: по глубине очереди и процессорному времени
+    анализа одного сообщения считает рекомендуемое число обработчиков
+    (консьюмеров/подов) и оценку времени разбора очереди.
+
+    при resize=True меняет prefetch_count канала консьюмера в пределах
+    [min_workers, max_workers]. это только число одновременно обрабатываемых
+    сообщений в процессе: анализ упирается в GIL, поэтому вычислительной
+    мощности это не добавляет, а время каждого сообщения растет и может
+    превысить дедлайн анализа
+    """
+
+    def __init__(
+        self,
+        queue_name,
+        service_time,
+        min_workers=WORKERS_MIN,
+        max_workers=WORKERS_MAX,
+        target_drain_seconds=TARGET_DRAIN_SECONDS,
+        target_utilization=TARGET_UTILIZATION,
+        poll_interval=AUTOSCALER_POLL_INTERVAL,
+        resize=AUTOSCALER_RESIZE,
+    ):
+        if min_workers < 1:
+            # prefetch_count=0 в amqp снимает ограничение, консьюмер заберет всю очередь
+            raise ValueError(f"WORKERS_MIN must be at least 1, got {min_workers}")
+        self.queue_name = queue_name
+        self.service_time = service_time
+        self.min_workers = min_workers
+        self.max_workers = max(min_workers, max_workers)
+        self.target_drain_seconds = target_drain_seconds
+        self.target_utilization = target_utilization
+        self.poll_interval = poll_interval
+        self.resize = resize
+
+        self.workers = min_workers
+        self.recommended_workers = min_workers
+        self.queue_depth = None
+        self.arrival_rate = None
+        self.processing_rate = None
+        self.estimated_drain_seconds = None
+        self.updated_at = None
+
+        self._connection = None
+        self._channel = None
+        self._poll_channel = None
+        self._last_poll_at = None
+        self._last_depth = None
+        self._last_completed = 0
+
+    def attach(self, connection, channel):
+        """
+        соединение и канал консьюмера. на канале консьюмера меняется prefetch,
+        очередь опрашивается на отдельном канале того же соединения, чтобы
+        ошибка пассивного declare не закрыла канал консьюмера
+        """
+        self._connection = connection
+        self._channel = channel
+        self._poll_channel = None
+
+    def clamp(self, workers):
+        return min(self.max_workers, max(self.min_workers, workers))
+
+    async def queue_depth_now(self):
+        if self._poll_channel is None or self._poll_channel.is_closed:
+            self._poll_channel = await self._connection.channel()
+        queue = await self._poll_channel.declare_queue(
+            self.queue_name, durable=True, passive=True, robust=False
+        )
+        return queue.declaration_result.message_count
+
+    def update(self, depth, now):
+        """пересчет рекомендации по новому замеру глубины очереди"""
+        completed = self.service_time.completed
+        if self._last_poll_at is not None and now > self._last_poll_at:
+            elapsed = now - self._last_poll_at
+            self.processing_rate = (completed - self._last_completed) / elapsed
+            growth = (depth - self._last_depth) / elapsed
+            self.arrival_rate = max(0.0, self.processing_rate + growth)
+        self._last_poll_at = now
+        self._last_depth = depth
+        self._last_completed = completed
+        self.queue_depth = depth
+        self.updated_at = time.time()
+
+        cpu_time = self.service_time.mean()
+        if cpu_time is None:
+            self.recommended_workers = self.clamp(1 if depth else self.min_workers)
+            self.estimated_drain_seconds = 0.0 if not depth else None
+            return
+
+        arrival_rate = self.arrival_rate or 0.0
+        # нагрузка от входящего потока и от накопившейся очереди
+        steady = arrival_rate * cpu_time / self.target_utilization
+        backlog = depth * cpu_time / self.target_drain_seconds
+        self.recommended_workers = self.clamp(math.ceil(steady + backlog))
+
+        # процесс из-за GIL разбирает не больше 1 / cpu_time сообщений в секунду,
+        # сколько бы сообщений он ни обрабатывал одновременно
+        spare_rate = 1 / cpu_time - arrival_rate
+        if not depth:
+            self.estimated_drain_seconds = 0.0
+        elif spare_rate > 0:
+            self.estimated_drain_seconds = depth / spare_rate
+        else:
+            self.estimated_drain_seconds = None
+
+    async def apply(self):
+        if self.recommended_workers == self.workers:
+            return
+        await self._channel.set_qos(prefetch_count=self.recommended_workers)
+        logger.info(
+            f"worker pool resized: {self.workers} -> {self.recommended_workers}"
+        )
+        self.workers = self.recommended_workers
+
+    async def poll(self):
+        depth = await self.queue_depth_now()
+        self.update(depth, time.monotonic())
+        logger.debug(f"autoscaler: {self.snapshot()}")
+        if self.resize:
+            await self.apply()
+
+    async def run(self):
+        """периодический опрос очереди до отмены задачи"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if self._connection is None or self._connection.is_closed:
+                continue
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"autoscaler poll failed: {e}")
+
+    def snapshot(self):
+        return {
+            "queue": self.queue_name,
+            "queue_depth": self.queue_depth,
+            "arrival_rate": self.arrival_rate,
+            "processing_rate": self.processing_rate,
+            "cpu_time_per_message": self.service_time.mean(),
+            "failed_analyses": self.service_time.failed,
+            "workers": self.workers,
+            "recommended_workers": self.recommended_workers,
+            "estimated_drain_seconds": self.estimated_drain_seconds,
+            "resize": self.resize,
+            "updated_at": self.updated_at,
+        }